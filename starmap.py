@@ -1,8 +1,18 @@
+import functools
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
-import astropy.coordinates as coord
-import astropy.units as u
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; plain NumPy fallbacks below
+    njit = None
+
+# Hash DataFrames by content (values + column names) so st.cache_data skips identical filter results.
+# Callers should pass only the columns they need: this hashes every column it is given.
+DF_HASH_FUNCS = {pd.DataFrame: lambda d: (pd.util.hash_pandas_object(d, index=True).values.tobytes()
+                                          + repr(list(d.columns)).encode())}
 
 def create_starmap(df_filt: pd.DataFrame,
                    color_by: str = 'st_spectype',
@@ -20,77 +30,159 @@ def create_starmap(df_filt: pd.DataFrame,
                             title="No stars match filters")
         return fig
 
-    # Ensure numeric columns
-    for col in ['ra', 'dec', 'sy_dist']:
-        if col in df_filt.columns:
-            df_filt[col] = pd.to_numeric(df_filt[col], errors='coerce').astype('float64')
-
-    df_plot = df_filt.dropna(subset=['ra', 'dec', 'sy_dist']).copy()
-    
-    # Aggregate per unique host
-    host_agg = {
-        'ra': 'first',
-        'dec': 'first',
-        'sy_dist': 'first',
-        'st_spectype': 'first',  # or mode/any if varies (rare)
-        'st_teff': 'first',
-        'st_mass': 'first',
-        'st_rad': 'first',
-        # Planet aggregates
-        'pl_name': lambda x: ', '.join(sorted(x.dropna().unique())),  # comma-separated unique planet names
-        'sy_pnum': 'size',                                       # count of planets
-        'disc_year': 'min'                                        # earliest discovery date
-        # Add more if needed, e.g. 'pl_rade': list for all radii
-    }
-
-    df_hosts = df_plot.groupby('hostname').agg(host_agg).reset_index()
-    # 
-    
-    
-    
-
-    df_hosts['fun_blurb'] = df_hosts.apply(generate_blurbs, axis=1)
+    # Only the columns the aggregation reads, so the cache key doesn't hash the whole catalogue
+    df_hosts = _compute_hosts(df_filt[[c for c in HOST_INPUT_COLS if c in df_filt]])
 
-    df_hosts['blurb'] = df_hosts.apply(generate_blurbs, axis=1)
-    
     if df_hosts.empty:
         fig = px.scatter_3d(pd.DataFrame(), x=[0], y=[0], z=[0],
                             title="No valid coordinates")
         return fig
+
+    return _build_fig(df_hosts, color_by, size_by, title)
+
+@st.cache_data(show_spinner=False, hash_funcs=DF_HASH_FUNCS)
+def _compute_hosts(df_filt: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates filtered planet rows to one row per host star.
+    - Adds Cartesian x/y/z (pc) columns
+    """
+    df_hosts = aggregate_hosts(df_filt)
+
+    if df_hosts.empty:
+        return df_hosts
     
-    # Astropy SkyCoord → Cartesian (x,y,z in pc)
-    sky = coord.SkyCoord(
-    ra=df_hosts['ra'].values * u.deg,
-    dec=df_hosts['dec'].values * u.deg,
-    distance=df_hosts['sy_dist'].values * u.pc,
-    frame='icrs'
+    # RA/Dec + distance → Cartesian (x,y,z in pc)
+    # x/y/z kept as float32: ample precision for WebGL marker positions, half the bytes of float64
+    df_hosts['x'], df_hosts['y'], df_hosts['z'] = radec_to_xyz(
+        df_hosts['ra'].to_numpy(dtype=np.float32),
+        df_hosts['dec'].to_numpy(dtype=np.float32),
+        df_hosts['sy_dist'].to_numpy(dtype=np.float32)
     )
 
-    df_hosts['x'] = sky.cartesian.x.to(u.pc).value
-    df_hosts['y'] = sky.cartesian.y.to(u.pc).value
-    df_hosts['z'] = sky.cartesian.z.to(u.pc).value
+    return df_hosts
+
+# Planet-level columns read by aggregate_hosts
+HOST_INPUT_COLS = [
+    'hostname', 'ra', 'dec', 'sy_dist', 'st_spectype', 'st_teff', 'st_mass', 'st_rad',
+    'pl_name', 'disc_year', 'potentially_habitable'
+]
+
+def aggregate_hosts(df_filt: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapses planet rows with valid RA/Dec/distance to one row per host star.
+    - Planet names joined, planet count, earliest discovery year
+    """
+    # ra/dec/sy_dist are normally numeric already (coerced once in load_planets);
+    # coerce any that aren't into a new frame rather than writing back into the caller's
+    coerced = {c: pd.to_numeric(df_filt[c], errors='coerce')
+               for c in ('ra', 'dec', 'sy_dist')
+               if c in df_filt and not pd.api.types.is_numeric_dtype(df_filt[c])}
+    if coerced:
+        df_filt = df_filt.assign(**coerced)
+
+    # Boolean-mask filter over just the columns the aggregation reads (no full-frame copy)
+    cols = [c for c in HOST_INPUT_COLS if c in df_filt]
+    mask = df_filt[['ra', 'dec', 'sy_dist']].notna().all(axis=1)
+    df_plot = df_filt.loc[mask, cols]
     
+    # Aggregate per unique host (built-in aggregators only, so pandas stays on its fast path)
+    hz_agg = {}
+    if 'potentially_habitable' in df_plot:
+        hz_agg['potentially_habitable'] = ('potentially_habitable', 'any')  # at least one planet
+
+    df_hosts = df_plot.groupby('hostname', sort=False, observed=True, as_index=False).agg(
+        ra=('ra', 'first'),
+        dec=('dec', 'first'),
+        sy_dist=('sy_dist', 'first'),
+        st_spectype=('st_spectype', 'first'),  # or mode/any if varies (rare)
+        st_teff=('st_teff', 'first'),
+        st_mass=('st_mass', 'first'),
+        st_rad=('st_rad', 'first'),
+        # Planet aggregates
+        sy_pnum=('pl_name', 'size'),         # count of planets
+        disc_year=('disc_year', 'min'),      # earliest discovery date
+        **hz_agg
+        # Add more if needed, e.g. 'pl_rade': list for all radii
+    )
+
+    # Comma-separated unique planet names: dedupe + sort once, then join per host
+    pl_names = (
+        df_plot.loc[df_plot['pl_name'].notna(), ['hostname', 'pl_name']]
+        .drop_duplicates()
+        .sort_values('pl_name')
+        .groupby('hostname', sort=False, observed=True)['pl_name']
+        .agg(', '.join)
+    )
+    df_hosts['pl_name'] = pl_names.reindex(df_hosts['hostname'].to_numpy()).fillna('').to_numpy()
+
+    return df_hosts
+
+def radec_to_xyz(ra_deg: np.ndarray, dec_deg: np.ndarray, d: np.ndarray):
+    """
+    Converts RA/Dec (deg) + distance to heliocentric Cartesian x/y/z (same unit as d).
+    - numba loop when available, else plain NumPy (no SkyCoord overhead)
+    - Memoized on the raw array bytes, so identical inputs across reruns skip the trig
+    """
+    ra_deg, dec_deg, d = (np.ascontiguousarray(a, dtype=np.float32) for a in (ra_deg, dec_deg, d))
+    return _radec_to_xyz_cached(ra_deg.tobytes(), dec_deg.tobytes(), d.tobytes())
+
+@functools.lru_cache(maxsize=8)
+def _radec_to_xyz_cached(ra_bytes: bytes, dec_bytes: bytes, d_bytes: bytes):
+    xyz = _radec_d_to_xyz(np.frombuffer(ra_bytes, dtype=np.float32),
+                          np.frombuffer(dec_bytes, dtype=np.float32),
+                          np.frombuffer(d_bytes, dtype=np.float32))
+    # Cached arrays are shared between callers, so keep them read-only
+    for a in xyz:
+        a.setflags(write=False)
+    return xyz
+
+if njit is not None:
+    @njit(fastmath=True, cache=True)  # serial: Streamlit sessions may call it concurrently
+    def _radec_d_to_xyz(ra_deg, dec_deg, d):
+        n = ra_deg.shape[0]
+        x = np.empty(n, dtype=np.float32)
+        y = np.empty(n, dtype=np.float32)
+        z = np.empty(n, dtype=np.float32)
+        for i in range(n):
+            r = ra_deg[i] * np.pi / 180.0
+            de = dec_deg[i] * np.pi / 180.0
+            cd = np.cos(de)
+            x[i] = d[i] * cd * np.cos(r)
+            y[i] = d[i] * cd * np.sin(r)
+            z[i] = d[i] * np.sin(de)
+        return x, y, z
+else:
+    def _radec_d_to_xyz(ra_deg, dec_deg, d):
+        ra_rad = np.deg2rad(ra_deg)
+        dec_rad = np.deg2rad(dec_deg)
+        cos_dec = np.cos(dec_rad)
+        return (d * cos_dec * np.cos(ra_rad),
+                d * cos_dec * np.sin(ra_rad),
+                d * np.sin(dec_rad))
+
+@st.cache_data(show_spinner=False, hash_funcs=DF_HASH_FUNCS)
+def _build_fig(df_hosts: pd.DataFrame,
+               color_by: str,
+               size_by: str,
+               title: str):
+    """
+    Builds the Plotly 3D scatter for aggregated host stars.
+    """
     # Color & size (using host-level cols)
     color_col = color_by if color_by in df_hosts else 'st_spectype'
     size_col  = size_by  if size_by  in df_hosts else 'st_rad'
 
-    # 3D Scatter
+    # One precomputed hover string per host instead of per-point hover_data templating
+    hover_text = _hover_text(df_hosts)
+
+    # 3D Scatter (px emits WebGL go.Scatter3d marker traces)
     fig = px.scatter_3d(
-        df_hosts,
+        df_hosts.assign(hover_text=hover_text),
         x='x', y='y', z='z',
         color=color_col,
         size=size_col,
-        hover_name='hostname',
-        hover_data=[
-            'pl_name',           # now aggregated
-            'sy_pnum',
-            'disc_year',      # format as needed
-            'sy_dist',
-            'st_teff',
-            'st_spectype',
-            'st_mass',
-            'st_rad'
-        ],
+        hover_name='hostname',   # kept so clicks still report the hostname as hovertext
+        custom_data=['hover_text'],
         title=title,
         labels={
             'x': 'X (pc)',
@@ -100,6 +192,7 @@ def create_starmap(df_filt: pd.DataFrame,
         opacity=0.8,
         size_max=30
     )
+    fig.update_traces(hovertemplate='%{customdata[0]}<extra></extra>')
 
     # Make it look nice
     fig.update_layout(
@@ -126,6 +219,30 @@ def create_starmap(df_filt: pd.DataFrame,
     )
 
     return fig
+
+def _hover_text(df_hosts: pd.DataFrame) -> pd.Series:
+    """
+    Builds the hover label for every host in one vectorized string pass.
+    """
+    def col(name):
+        return df_hosts[name].astype(object).fillna('?').astype(str)
+
+    def num(name, decimals):
+        # Fixed-decimal formatting, so float32 columns don't print their noise digits
+        s = df_hosts[name]
+        txt = np.char.mod(f'%.{decimals}f', s.to_numpy(dtype='float64', na_value=np.nan))
+        return pd.Series(txt, index=s.index).where(s.notna(), '?')
+
+    return (
+        '<b>' + col('hostname') + '</b>'
+        + '<br>Planets (' + num('sy_pnum', 0) + '): ' + col('pl_name')
+        + '<br>Discovered: ' + num('disc_year', 0)
+        + '<br>Distance: ' + num('sy_dist', 1) + ' pc'
+        + '<br>Type: ' + col('st_spectype')
+        + '<br>Teff: ' + num('st_teff', 0) + ' K'
+        + '<br>Mass: ' + num('st_mass', 2) + ' M☉'
+        + '<br>Radius: ' + num('st_rad', 2) + ' R☉'
+    )
     
 def add_host_labels(fig: px.scatter_3d, df_hosts: pd.DataFrame,
                     text_col: str = 'hostname',
@@ -138,52 +255,58 @@ def add_host_labels(fig: px.scatter_3d, df_hosts: pd.DataFrame,
     - Optional: make toggleable later via a param.
     """
     fig.add_scatter3d(
-        x=df_hosts['x'],
-        y=df_hosts['y'],
-        z=df_hosts['z'],
+        x=df_hosts['x'].to_numpy(),
+        y=df_hosts['y'].to_numpy(),
+        z=df_hosts['z'].to_numpy(),
         mode='text',
-        text=df_hosts[text_col],
+        text=df_hosts[text_col].to_numpy(),
         textposition=position,             # options: 'top center', 'bottom right', etc.
         textfont=dict(size=font_size, color=color),
         hoverinfo='skip',                  # no extra hover on labels
         showlegend=False                   # no legend entry
     )   
     
+# Blurb constants (updated Feb 2026: Parker Solar Probe holds ~692,000 km/h record)
+FASTEST_SPEED_KMH = 692000          # Parker Solar Probe peak (Dec 2024 onward)
+HOURS_PER_YEAR = 8760               # approx
+LY_PER_PC = 3.2616                  # 1 pc ≈ 3.2616 light-years
+
+# Travel-time factors, hoisted out of the per-row blurb code
+_PC_TO_KM = 3.0857e13               # km in one parsec
+_SPEED_KM_PER_YEAR = FASTEST_SPEED_KMH * HOURS_PER_YEAR
+
+# Spectral flavor, keyed on the first letter of the (uppercased) spectral type
+_SPT_DESC = {
+    'M': "a chill red dwarf that's basically immortal (trillions of years potential lifespan)",
+    'K': "a cozy orange dwarf — long-lived and pretty forgiving for planets",
+    'G': "a proper Sun-like yellow star (the classic 'Goldilocks' host)",
+    'F': "a bright white-yellow hotshot (shorter life but dazzling)",
+}
+
+HZ_YES = "At least one might be in the sweet spot for liquid water 🌊 (fingers crossed for aliens)"
+HZ_NO = "probably not — wrong orbit or too extreme"
+
 # create blurb for click listener on plot
 def generate_blurbs(row):
-    # Constants (updated Feb 2026: Parker Solar Probe holds ~692,000 km/h record)
-    FASTEST_SPEED_KMH = 692000          # Parker Solar Probe peak (Dec 2024 onward)
-    HOURS_PER_YEAR = 8760               # approx
-    LIGHT_YEAR_KM = 9.46073e12          # exact-ish value
     hostname = row['hostname']
-    spt = row.get('st_spectype', 'mysterious').upper()
+    spt = row.get('st_spectype')
+    spt = 'MYSTERIOUS' if pd.isna(spt) else str(spt).upper()
     num_pl = row['sy_pnum'] if pd.notna(row['sy_pnum']) else 0
     pl_list = row['pl_name'] if pd.notna(row['pl_name']) else "none known yet"
     dist_pc = row['sy_dist']
-    dist_ly = dist_pc / 3.08568          # pc to light-years (approx 1 pc = 3.08568 ly)
+    dist_ly = dist_pc * LY_PER_PC
     
     # Rough travel time (one-way, no relativity or acceleration fanciness)
-    distance_km = dist_ly * LIGHT_YEAR_KM
-    speed_km_per_year = FASTEST_SPEED_KMH * HOURS_PER_YEAR
-    travel_years = int(distance_km / speed_km_per_year) if speed_km_per_year > 0 else "way too long"
+    travel_years = int(dist_pc * _PC_TO_KM / _SPEED_KM_PER_YEAR)
     
     # Spectral flavor
-    if spt.startswith('M'):
-        star_desc = "a chill red dwarf that's basically immortal (trillions of years potential lifespan)"
-    elif spt.startswith('K'):
-        star_desc = "a cozy orange dwarf — long-lived and pretty forgiving for planets"
-    elif spt.startswith('G'):
-        star_desc = "a proper Sun-like yellow star (the classic 'Goldilocks' host)"
-    elif spt.startswith('F'):
-        star_desc = "a bright white-yellow hotshot (shorter life but dazzling)"
-    else:
-        star_desc = "an intriguing star of type " + spt
+    star_desc = _SPT_DESC.get(spt[:1], "an intriguing star of type " + spt)
     
     # HZ cheek
-    hz_status = "probably not — wrong orbit or too extreme" 
+    hz_status = HZ_NO
     if row.get('potentially_habitable', False):
-        hz_status = "At least one might be in the sweet spot for liquid water 🌊 (fingers crossed for aliens)"
-    
+        hz_status = HZ_YES
+
     blurb = f"""
             **{hostname}**  
 
@@ -197,4 +320,14 @@ def generate_blurbs(row):
             Roughly **{travel_years:,} years** one-way. Better bring a really good book... or wait for that warp drive breakthrough. 🚀😅
             """
 
-    return blurb
\ No newline at end of file
+    return blurb
+
+def host_blurb(df_filt: pd.DataFrame, hostname: str):
+    """
+    Blurb for a single host, built on demand (e.g. when its point is clicked).
+    - Returns None if the host has no valid coordinates in df_filt
+    """
+    df_host = aggregate_hosts(df_filt[df_filt['hostname'] == hostname])
+    if df_host.empty:
+        return None
+    return generate_blurbs(df_host.iloc[0])
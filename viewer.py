@@ -1,3 +1,4 @@
+import re
 import streamlit as st
 import pandas as pd
 from starmap import *
@@ -6,6 +7,11 @@ from starmap import *
 @st.cache_data
 def load_planets():
     df = pd.read_parquet("data/planets.parquet")
+    # Low-cardinality strings → category (integer codes for groupby/isin/legend)
+    for col in ('st_spectype', 'hostname', 'disc_facility'):
+        if col in df:
+            df[col] = df[col].astype('category')
+
     date_cols = ['disc_pubdate'] if 'disc_pubdate' in df else []
     for col in date_cols:
         df[col] = pd.to_datetime(df[col], errors='coerce')
@@ -13,19 +19,55 @@ def load_planets():
     numeric_cols = [
         'pl_rade', 'pl_orbsmax', 'pl_orbper', 'pl_orbeccen', 'pl_eqt',
         'st_teff', 'st_rad', 'st_mass', 'st_met', 'st_logg',
-        'sy_dist', 'sy_vmag', 'sy_kmag', 'sy_gaiamag'
+        'sy_dist', 'sy_vmag', 'sy_kmag', 'sy_gaiamag', 'ra', 'dec'
     ]
     for col in numeric_cols:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        # Ensure Date is date-only (if needed — usually not for this table)
-        if 'disc_pubdate' in df.columns:
-            df['disc_pubdate'] = pd.to_datetime(df['disc_pubdate']).dt.date
+            # Downcast to float32 to shrink the cached frame (hover text formats its own decimals)
+            df[col] = pd.to_numeric(df[col], errors='coerce', downcast='float')
+    # Integer counts/years shrink to the smallest int type that fits (left as-is if they contain NaN)
+    for col in ('sy_pnum', 'disc_year'):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce', downcast='integer')
+
+    # Ensure Date is date-only (if needed — usually not for this table)
+    if 'disc_pubdate' in df.columns:
+        df['disc_pubdate'] = pd.to_datetime(df['disc_pubdate']).dt.date
+
+    # Rough liquid-water proxy, computed once so blurbs don't branch per row
+    if 'pl_eqt' in df.columns:
+        df['potentially_habitable'] = df['pl_eqt'].between(180, 310)
     
     return df
 
+EVOLVED_RE = re.compile(r'III|IV|giant|evolved', re.I)
+
+def spectral_group_mask(df_pre_filt: pd.DataFrame, spectral_groups: list) -> pd.Series:
+    """Boolean mask of rows whose st_spectype falls in any of the chosen groups."""
+    mask = pd.Series(False, index=df_pre_filt.index)
+
+    # Uppercase first letter computed once, shared by every group check
+    # (map/.str.contains on a categorical run once per category, not per row)
+    spt = df_pre_filt['st_spectype']
+    spt0 = spt.map(lambda t: t[:1].upper(), na_action='ignore')
+    evolved = spt.str.contains(EVOLVED_RE, na=False)
+
+    if "F-type" in spectral_groups:
+        mask |= spt0.eq('F')
+    if "G-type" in spectral_groups:
+        mask |= spt0.eq('G')
+    if "K-type" in spectral_groups:
+        mask |= spt0.eq('K')
+    if "M-type" in spectral_groups:
+        mask |= spt0.eq('M')
+    if "Giants / Evolved" in spectral_groups:
+        mask |= evolved
+    if "Other" in spectral_groups:
+        mask |= ~spt0.isin(['F', 'G', 'K', 'M']) & ~evolved
+
+    return mask
+
 df = load_planets()
-# selected_types = st.multiselect("Star Spectral Type", options=df['st_spectype'].dropna().unique(), default=[])
 
 # ── Filters ────────────────────────────────────────────────────────────────
 st.header("Exoplanet Host Star Explorer")
@@ -41,13 +83,8 @@ df_pre_filt = df[
     (df['pl_eqt'].between(*temp_range))
 ]
 
-#computing available spectral types for filtering
-
-
-available_types = sorted(df_pre_filt['st_spectype'].dropna().unique())
-# If no data left → show message or empty list
-if len(available_types) == 0:
-    available_types = []
+# If no typed stars are left → show message
+if not df_pre_filt['st_spectype'].notna().any():
     st.info("No stars match the current radius / distance / temp filters.")
 
 spectral_groups = st.multiselect(
@@ -67,28 +104,14 @@ with st.expander("Goldilocks Zone (Habitable Zone) Quick Guide", expanded=False)
     Your planet equilibrium temp filter set to ({temp_range[0]}–{temp_range[1]} K at the moment) already proxies this somewhat — Earth-like ~255 K, but atmospheres/greenhouse push real HZ outward.
     """)
 
-mask = pd.Series(False, index=df_pre_filt.index)
-
-if "F-type" in spectral_groups:
-    mask |= df_pre_filt['st_spectype'].str.upper().str.startswith('F')
-if "G-type" in spectral_groups:
-    mask |= df_pre_filt['st_spectype'].str.upper().str.startswith('G')
-if "K-type" in spectral_groups:
-    mask |= df_pre_filt['st_spectype'].str.upper().str.startswith('K')
-if "M-type" in spectral_groups:
-    mask |= df_pre_filt['st_spectype'].str.upper().str.startswith('M')
-if "Giants / Evolved" in spectral_groups:
-    mask |= df_pre_filt['st_spectype'].str.contains('III|IV|giant|evolved', case=False, na=False)
-if "Other" in spectral_groups:
-    mask |= ~df_pre_filt['st_spectype'].str.startswith(('F', 'G', 'K', 'M'), na=False) & ~df_pre_filt['st_spectype'].str.contains('III|IV|giant|evolved', case=False, na=False)
-
-selected_types = df_pre_filt.loc[mask, 'st_spectype'].dropna().unique()
+mask = spectral_group_mask(df_pre_filt, spectral_groups)
 
 # Final filtered df: apply spectral type on top of pre-filter
-if selected_types.any():
+# (fall back to the pre-filter when the chosen groups match no typed stars)
+if df_pre_filt['st_spectype'][mask].notna().any():
     df_filt = df_pre_filt[mask]
 else:
-    df_filt = df_pre_filt.copy()  
+    df_filt = df_pre_filt
 
 st.caption(f"Showing {len(df_filt)} host stars after all filters")
 
@@ -97,7 +120,13 @@ if 'selected_host' not in st.session_state:
     st.session_state.selected_host = None
 
 # st.subheader("3D Interactive Star Map")
-fig = create_starmap(df_filt)
+# Clicking a point reruns the script with the same df_filt, so reuse the last figure.
+# df_filt is always a row subset of the cached df, so its index identifies it.
+fig_key = int(pd.util.hash_pandas_object(df_filt.index).sum())
+if st.session_state.get('fig_key') != fig_key:
+    st.session_state.fig = create_starmap(df_filt)
+    st.session_state.fig_key = fig_key
+fig = st.session_state.fig
 
 # Render chart with selection
 selected = st.plotly_chart(
@@ -112,8 +141,8 @@ selected = st.plotly_chart(
 if selected and 'points' in selected and selected['points']:
     # Get first clicked point (or handle multi if needed)
     clicked_point = selected['points'][0]
-    # Assuming your hover_name='hostname', or use custom_data if you add it
-    selected_hostname = clicked_point.get('hovertext') or clicked_point.get('text') or clicked_point.get('customdata', [None])[0]
+    # hover_name='hostname' on the host traces; the Sun point has no hovertext
+    selected_hostname = clicked_point.get('hovertext')
     
     if selected_hostname:
         st.session_state.selected_host = selected_hostname
@@ -121,10 +150,9 @@ if selected and 'points' in selected and selected['points']:
 # Show blurb box below
 st.subheader("Selected Star Spotlight")
 if st.session_state.selected_host:
-    # Find the row
-    selected_row = df_filt[df_filt['hostname'] == st.session_state.selected_host]
-    if not selected_row.empty:
-        blurb = selected_row['blurb'].iloc[0]
+    # Build the blurb for just this host
+    blurb = host_blurb(df_filt, st.session_state.selected_host)
+    if blurb is not None:
         st.markdown(blurb)
         if st.button("Clear selection"):
             st.session_state.selected_host = None